@@ -1,13 +1,34 @@
 """Flask web interface for the Regulations Aggregator."""
 
+import base64
+import binascii
+import hashlib
+import logging
+import re
 import sqlite3
-from flask import Flask, request, redirect, url_for, render_template_string
-
-from datetime import date, datetime, timedelta
-from regulations_aggregator import DB_FILE, init_db, aggregate_updates, generate_all_briefs
+import sys
+import threading
+from flask import Flask, request, redirect, url_for, render_template_string, make_response
+from flask.logging import has_level_handler
+from jinja2 import DictLoader, FileSystemBytecodeCache
+
+from datetime import date
+from regulations_aggregator import (
+    connect_db, cutoff_date, init_db, aggregate_updates, generate_all_briefs,
+)
 
 app = Flask(__name__)
-init_db()
+
+# Fetch and brief progress is logged by regulations_aggregator. Under
+# `flask run` or a WSGI server nothing configures logging for it, so show
+# it on stdout as the CLI does, unless the host already handles it.
+_aggregator_log = logging.getLogger("regulations_aggregator")
+if _aggregator_log.level == logging.NOTSET:
+    _aggregator_log.setLevel(logging.INFO)
+if not has_level_handler(_aggregator_log):
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _aggregator_log.addHandler(_handler)
 
 PAGE_SIZE = 25
 
@@ -98,32 +119,32 @@ INDEX_HTML = (
     '{% extends "base" %}'
     "{% block content %}"
     "{% if message %}<div class='msg'>{{ message }}</div>{% endif %}"
-    "<form class='search-bar' method='get' action='{{ url_for(\"index\") }}'>"
+    "<form class='search-bar' method='get' action='{{ index_base }}'>"
     "{% if level %}<input type='hidden' name='level' value='{{ level }}'>{% endif %}"
     "<input type='text' name='q' value='{{ q }}' placeholder='Search title or description'> "
     "<button type='submit'>Search</button>"
-    "{% if q %} <a href='{{ url_for(\"index\", level=level) }}'>Clear</a>{% endif %}"
+    "{% if q %} <a href='{{ index_base }}?{{ {\"level\": level}|urlencode }}'>Clear</a>{% endif %}"
     "</form>"
     "<div class='filters'>"
-    "<a class='{% if not level %}active{% endif %}' href='{{ url_for(\"index\", q=q) }}'>All</a>"
-    "<a class='{% if level==\"federal\" %}active{% endif %}' href='{{ url_for(\"index\", level=\"federal\", q=q) }}'>Federal</a>"
-    "<a class='{% if level==\"state\" %}active{% endif %}' href='{{ url_for(\"index\", level=\"state\", q=q) }}'>State</a>"
+    "<a class='{% if not level %}active{% endif %}' href='{{ index_base }}?{{ {\"q\": q}|urlencode }}'>All</a>"
+    "<a class='{% if level==\"federal\" %}active{% endif %}' href='{{ index_base }}?{{ {\"level\": \"federal\", \"q\": q}|urlencode }}'>Federal</a>"
+    "<a class='{% if level==\"state\" %}active{% endif %}' href='{{ index_base }}?{{ {\"level\": \"state\", \"q\": q}|urlencode }}'>State</a>"
     "</div>"
     "<table><tr><th>Date</th><th>Level</th><th>Title</th></tr>"
     "{% for r in records %}"
     "<tr>"
     "<td>{{ r.published_date or '—' }}</td>"
     "<td><span class='badge badge-{{ r.level }}'>{{ r.level }}</span></td>"
-    "<td><a href='{{ url_for(\"detail\", record_id=r.id) }}'>{{ r.title or r.id }}</a></td>"
+    "<td><a href='{{ detail_prefix }}{{ r.id|urlencode }}'>{{ r.title or r.id }}</a></td>"
     "</tr>"
     "{% else %}"
     "<tr><td colspan='3'>No records found.</td></tr>"
     "{% endfor %}"
     "</table>"
     "<div class='pagination'>"
-    "{% if page > 1 %}<a href='{{ url_for(\"index\", page=page-1, level=level, q=q) }}'>&laquo; Previous</a>{% endif %}"
+    "{% if page > 1 %}<a href='{{ index_base }}?{{ {\"level\": level, \"q\": q}|urlencode }}'>&laquo; First</a>{% endif %}"
     "<span>Page {{ page }}</span>"
-    "{% if has_next %}<a href='{{ url_for(\"index\", page=page+1, level=level, q=q) }}'>Next &raquo;</a>{% endif %}"
+    "{% if next_cursor %}<a href='{{ index_base }}?{{ {\"before\": next_cursor, \"page\": page + 1, \"level\": level, \"q\": q}|urlencode }}'>Next &raquo;</a>{% endif %}"
     "</div>"
     "{% endblock %}"
 )
@@ -140,10 +161,16 @@ DETAIL_HTML = (
     "<tr><td>Description</td><td>{{ record.description or '—' }}</td></tr>"
     "<tr><td>Source URL</td><td>{% if record.source_url %}<a href='{{ record.source_url }}'>{{ record.source_url }}</a>{% else %}—{% endif %}</td></tr>"
     "<tr><td>Source Modified</td><td>{{ record.source_last_modified or '—' }}</td></tr>"
-    "<tr><td>Last Updated</td><td>{{ record.last_updated or '—' }}</td></tr>"
+    "<tr><td>Last Updated (UTC)</td><td>{{ record.last_updated or '—' }}</td></tr>"
     "</table>"
     "<h3>Full Text</h3>"
-    "<pre>{{ record.full_text or '(none)' }}</pre>"
+    "<pre id='full-text'>Loading&hellip;</pre>"
+    "<noscript><p><a href='{{ url_for(\"detail_full_text\", record_id=record.id) }}'>View full text</a></p></noscript>"
+    "<script>"
+    "fetch({{ url_for('detail_full_text', record_id=record.id)|tojson }})"
+    ".then(r => r.text())"
+    ".then(t => { document.getElementById('full-text').textContent = t; });"
+    "</script>"
     "{% endblock %}"
 )
 
@@ -223,84 +250,205 @@ BRIEF_HTML = """
 {% endblock %}
 """
 
+NOT_FOUND_HTML = (
+    '{% extends "base" %}{% block content %}'
+    "<p>Record not found.</p>"
+    '<p><a href="{{ url_for(\'index\') }}">&laquo; Back to list</a></p>'
+    "{% endblock %}"
+)
+
+# The templates are module constants, so build the overlay environment and
+# compile each one once at import rather than on every request. Nothing is
+# ever edited at runtime, so skip reload checks; the bytecode cache lets new
+# workers load the "base" layout without recompiling it. Flask only
+# autoescapes names ending in .html, which would leave "base" unescaped.
+_ENV = app.jinja_env.overlay(
+    loader=DictLoader({"base": BASE_HTML}),
+    autoescape=True,
+    cache_size=400,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(),
+)
+_TEMPLATES = {
+    s: _ENV.from_string(s)
+    for s in (INDEX_HTML, DETAIL_HTML, FETCH_HTML, BRIEF_HTML, NOT_FOUND_HTML)
+}
+
+# Mixed into the listing's ETag so a deploy that changes the page's markup
+# invalidates cached copies. Template edits change it on their own; bump
+# LISTING_VERSION when index() itself renders differently.
+LISTING_VERSION = "1"
+_LISTING_ETAG_SALT = hashlib.blake2b(
+    (LISTING_VERSION + BASE_HTML + INDEX_HTML).encode(), digest_size=8
+).hexdigest()
+
+
+_local = threading.local()
+
 
 def get_db():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
+    """Return this thread's SQLite connection, opening it on first use.
+
+    The connection is kept open and reused across requests handled by the
+    same worker thread, so the per-connection setup below runs only once.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        init_db()  # no-op once this process has set up the schema
+        conn = connect_db(isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA mmap_size=268435456")
+        _local.conn = conn
     return conn
 
 
+def encode_cursor(row):
+    """Encode a row's (published_date, id) sort key as an opaque URL token."""
+    raw = f"{row['published_date'] or ''}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor(); return None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+    except (binascii.Error, UnicodeError):
+        return None
+    published_date, sep, record_id = raw.partition("|")
+    if not sep:
+        return None
+    return published_date, record_id
+
+
+# FTS5 cannot parse a quoted term containing NUL, so control characters go
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]")
+
+
+def fts_query(q):
+    """Turn free-text search input into an FTS5 query of quoted prefix terms.
+
+    Returns an empty string if nothing searchable is left.
+    """
+    terms = _CONTROL_CHARS_RE.sub(" ", q).split()
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
 def render(template_str, **kwargs):
-    """Render a template that extends the base layout."""
-    from jinja2 import DictLoader
+    """Render a precompiled template that extends the base layout.
 
-    env = app.jinja_env.overlay(loader=DictLoader({"base": BASE_HTML}))
-    tmpl = env.from_string(template_str)
-    return tmpl.render(**kwargs, url_for=url_for)
+    url_for comes from the environment globals Flask installs on jinja_env.
+    """
+    return _TEMPLATES[template_str].render(**kwargs)
 
 
 @app.route("/")
 def index():
     q = request.args.get("q", "").strip()
     level = request.args.get("level", "").strip()
-    page = request.args.get("page", 1, type=int)
     message = request.args.get("message", "")
-    if page < 1:
-        page = 1
+    before = request.args.get("before", "")
+    cursor = decode_cursor(before)
+    # The page number is only a display counter; the cursor drives the query.
+    page = max(request.args.get("page", 1, type=int), 2) if cursor else 1
 
-    offset = (page - 1) * PAGE_SIZE
-    sql = "SELECT * FROM regulations WHERE 1=1"
+    # The listing only changes when a fetch writes rows, so let browsers
+    # revalidate against a cheap summary of the table instead of re-rendering.
+    conn = get_db()
+    max_updated, count = conn.execute(
+        "SELECT MAX(last_updated), COUNT(*) FROM regulations"
+    ).fetchone()
+    etag = hashlib.blake2b(
+        f"{_LISTING_ETAG_SALT}|{max_updated}|{count}|"
+        f"{q}|{level}|{page}|{before}|{message}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    # If-None-Match uses weak comparison (RFC 9110), so a W/ tag added by a
+    # compressing proxy still matches
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+
+    sql = " FROM regulations r"
     params = []
 
+    match = fts_query(q)
+    if match:
+        sql += " JOIN regulations_fts f ON f.rowid = r.rowid WHERE regulations_fts MATCH ?"
+        params.append(match)
+    else:
+        sql += " WHERE 1=1"
     if level in ("federal", "state"):
-        sql += " AND level = ?"
+        sql += " AND r.level = ?"
         params.append(level)
-    if q:
-        sql += " AND (title LIKE ? OR description LIKE ?)"
-        params.extend([f"%{q}%", f"%{q}%"])
-
-    sql += " ORDER BY published_date DESC LIMIT ? OFFSET ?"
-    params.extend([PAGE_SIZE + 1, offset])
-
-    conn = get_db()
-    rows = conn.execute(sql, params).fetchall()
-    conn.close()
-
-    has_next = len(rows) > PAGE_SIZE
-    records = rows[:PAGE_SIZE]
 
-    return render(
+    seek = " AND (r.published_date, r.id) < (?, ?)"
+    records = conn.execute(
+        "SELECT r.id, r.level, r.title, r.published_date" + sql + (seek if cursor else "")
+        + " ORDER BY r.published_date DESC, r.id DESC LIMIT ?",
+        params + list(cursor or ()) + [PAGE_SIZE],
+    ).fetchall()
+
+    # A one-row index probe past the last record decides whether to link on.
+    next_cursor = None
+    if len(records) == PAGE_SIZE:
+        last = records[-1]
+        if conn.execute(
+            "SELECT 1" + sql + seek + " LIMIT 1",
+            params + [last["published_date"], last["id"]],
+        ).fetchone():
+            next_cursor = encode_cursor(last)
+
+    # Build the per-row and filter links by concatenation rather than a
+    # url_for() call each; the "_" placeholder is trimmed off the detail URL.
+    response = make_response(render(
         INDEX_HTML,
         title="Home",
+        index_base=url_for("index"),
+        detail_prefix=url_for("detail", record_id="_")[:-1],
         records=records,
         page=page,
-        has_next=has_next,
+        next_cursor=next_cursor,
         q=q,
         level=level,
         message=message,
-    )
+    ))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, must-revalidate"
+    return response
 
 
 @app.route("/record/<path:record_id>")
 def detail(record_id):
     conn = get_db()
+    # full_text is loaded separately by the page, see detail_full_text()
     record = conn.execute(
-        "SELECT * FROM regulations WHERE id = ?", (record_id,)
+        "SELECT id, level, title, description, published_date, source_url,"
+        " source_last_modified, last_updated FROM regulations WHERE id = ?",
+        (record_id,)
     ).fetchone()
-    conn.close()
 
     if record is None:
-        return render(
-            '{% extends "base" %}{% block content %}'
-            "<p>Record not found.</p>"
-            '<p><a href="{{ url_for(\'index\') }}">&laquo; Back to list</a></p>'
-            "{% endblock %}",
-            title="Not Found",
-        ), 404
+        return render(NOT_FOUND_HTML, title="Not Found"), 404
 
     return render(DETAIL_HTML, title=record["title"] or record["id"], record=record)
 
 
+# A prefix of its own: under /record/<id>/full_text, an id ending in
+# "/full_text" would shadow that record's detail page.
+@app.route("/full_text/<path:record_id>")
+def detail_full_text(record_id):
+    conn = get_db()
+    row = conn.execute(
+        "SELECT full_text FROM regulations WHERE id = ?", (record_id,)
+    ).fetchone()
+
+    if row is None:
+        return "Record not found.", 404, {"Content-Type": "text/plain; charset=utf-8"}
+
+    return row["full_text"] or "(none)", 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+
 @app.route("/fetch")
 def fetch():
     return render(FETCH_HTML, title="Fetch Updates")
@@ -315,7 +463,7 @@ def do_fetch():
 @app.route("/brief")
 def brief():
     message = request.args.get("message", "")
-    cutoff = (datetime.now() - timedelta(days=14)).strftime('%Y-%m-%d')
+    cutoff = cutoff_date(14)
     conn = get_db()
     rows = conn.execute('''
         SELECT r.id AS regulation_id, r.level, r.title, r.published_date,
@@ -325,7 +473,6 @@ def brief():
         WHERE r.published_date >= ?
         ORDER BY r.published_date DESC
     ''', (cutoff,)).fetchall()
-    conn.close()
 
     today = date.today().strftime("%A, %B %d, %Y")
     return render(BRIEF_HTML, title="Monday Brief", briefs=rows,
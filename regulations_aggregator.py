@@ -3,8 +3,21 @@ import os
 import sys
 import requests
 import json
+import logging
+import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # optional: much faster serialization of API payloads
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # Configuration via environment variables
 FEDERAL_API_KEY = os.environ.get('REGULATIONS_GOV_API_KEY', '')
@@ -16,9 +29,56 @@ DB_FILE = os.environ.get('REGULATIONS_DB_FILE', 'regulations.db')
 SEARCH_KEYWORDS = ['food', 'beverage', 'dairy', 'meat', 'poultry', 'seafood',
                    'alcohol', 'restaurant', 'nutrition', 'drink']
 
+# Shared HTTP session so keyword requests reuse pooled connections; transient
+# failures and rate limiting are retried with backoff by urllib3.
+FETCH_WORKERS = 8
+MAX_PAGES = 5  # per keyword, so a wide date window cannot fan out unbounded
+SESSION = requests.Session()
+SESSION.headers.update({
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'User-Agent': 'regs-agg/1.0',
+})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+
+# Database files whose schema has been set up by this process; init_db()
+# still checks that the table exists before trusting an entry
+_initialized_dbs = set()
+
+# Serializes store_records() batches that share one connection across threads
+_write_lock = threading.Lock()
+
+
+def connect_db(**kwargs):
+    """Open a connection to DB_FILE with the standard per-connection tuning.
+
+    WAL itself is persistent and set once by init_db(); the settings here
+    only last for the connection, so every call site goes through this.
+    In WAL mode synchronous=NORMAL cannot corrupt the database on power loss;
+    at worst the most recent commits are rolled back.
+    """
+    conn = sqlite3.connect(DB_FILE, timeout=5.0, **kwargs)  # busy_timeout
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = -65536')
+    return conn
+
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = connect_db()
+    # Still re-run if the file was deleted or swapped out since our last setup
+    if DB_FILE in _initialized_dbs and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='regulations'"
+    ).fetchone():
+        conn.close()
+        return
+    conn.execute('PRAGMA journal_mode = WAL')
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS regulations (
@@ -33,6 +93,23 @@ def init_db():
             last_updated TEXT
         )
     ''')
+    # Rows written before store_records() coerced missing dates to '' would
+    # never satisfy the listing's (published_date, id) < (?, ?) seek
+    cursor.execute("UPDATE regulations SET published_date = '' WHERE published_date IS NULL")
+    # Supports keyset pagination of the newest-first listing
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reg_pub_id
+            ON regulations(published_date DESC, id DESC)
+    ''')
+    # Level-filtered listings seek straight to their slice in sort order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reg_level_pub
+            ON regulations(level, published_date DESC, id DESC)
+    ''')
+    # Makes MAX(last_updated) for the web listing's ETag a single seek
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reg_last_updated ON regulations(last_updated)
+    ''')
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS briefs (
             regulation_id TEXT PRIMARY KEY,
@@ -43,170 +120,311 @@ def init_db():
             FOREIGN KEY (regulation_id) REFERENCES regulations(id)
         )
     ''')
+
+    # Full-text index over title/description, kept in sync by triggers
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='regulations_fts'"
+    )
+    fts_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS regulations_fts USING fts5(
+            title, description,
+            content='regulations', content_rowid='rowid', tokenize='unicode61'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS regulations_ai AFTER INSERT ON regulations BEGIN
+            INSERT INTO regulations_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS regulations_ad AFTER DELETE ON regulations BEGIN
+            INSERT INTO regulations_fts(regulations_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS regulations_au
+        AFTER UPDATE OF title, description ON regulations BEGIN
+            INSERT INTO regulations_fts(regulations_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO regulations_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+    ''')
+    if not fts_exists:
+        # Index any rows that predate the FTS table
+        cursor.execute("INSERT INTO regulations_fts(regulations_fts) VALUES ('rebuild')")
     conn.commit()
+    # Planner statistics so the indexes above are actually chosen. A full
+    # ANALYZE scans every table and index, so only run it when there are no
+    # statistics yet; afterwards PRAGMA optimize re-analyzes just the tables
+    # whose size has drifted (0x10000: consider all tables, on SQLite 3.46+).
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'"
+    )
+    if cursor.fetchone() is None:
+        cursor.execute('ANALYZE')
+    else:
+        cursor.execute('PRAGMA optimize=0x10002')
     conn.close()
-
-
-def store_records(level, records, source_url):
+    _initialized_dbs.add(DB_FILE)
+
+
+# Update in place, and only when the source copy is newer than ours (or either
+# side has no modification date). Rows that fail the check are left untouched,
+# so the freshness test needs no separate SELECT.
+UPSERT_REGULATION_SQL = '''
+    INSERT INTO regulations
+        (id, level, title, description, published_date,
+         full_text, source_url, source_last_modified, last_updated)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    ON CONFLICT(id) DO UPDATE SET
+        level = excluded.level,
+        title = excluded.title,
+        description = excluded.description,
+        published_date = excluded.published_date,
+        full_text = excluded.full_text,
+        source_url = excluded.source_url,
+        source_last_modified = excluded.source_last_modified,
+        last_updated = excluded.last_updated
+    WHERE COALESCE(regulations.source_last_modified, '') = ''
+       OR excluded.source_last_modified = ''
+       OR excluded.source_last_modified > regulations.source_last_modified
+'''
+
+
+def store_records(level, records, source_url, conn=None):
     """Store normalized records into the database.
 
     Each record should be a dict with keys:
         id, title, description, published_date, full_text, source_last_modified
+
+    ``conn`` may be a connection opened with ``isolation_level=None`` to reuse
+    across calls; the caller then owns it. Otherwise one is opened and closed.
     """
-    conn = sqlite3.connect(DB_FILE)
+    records = [rec for rec in records if rec.get('id')]
+    if not records:
+        return
+
+    # Autocommit mode so the transaction below is exactly the one we open
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_db(isolation_level=None)
     cursor = conn.cursor()
-    now = datetime.now().isoformat()
 
+    # last_updated is stamped by SQLite in the statement itself
+    rows = []
     for rec in records:
-        doc_id = rec.get('id')
-        if not doc_id:
-            continue
-
-        source_mod = rec.get('source_last_modified', '')
-
-        # Skip if we already have this record and the source hasn't changed
-        cursor.execute(
-            'SELECT source_last_modified FROM regulations WHERE id = ?',
-            (doc_id,)
-        )
-        existing = cursor.fetchone()
-        if existing and existing[0] and source_mod and existing[0] >= source_mod:
-            print(f"Skipping {doc_id} (no update at source).")
-            continue
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO regulations
-                (id, level, title, description, published_date,
-                 full_text, source_url, source_last_modified, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            doc_id,
+        get = rec.get
+        rows.append((
+            get('id'),
             level,
-            rec.get('title', ''),
-            rec.get('description', ''),
-            rec.get('published_date', ''),
-            rec.get('full_text', ''),
+            get('title', ''),
+            get('description', ''),
+            get('published_date') or '',
+            get('full_text', ''),
             source_url,
-            source_mod,
-            now,
+            get('source_last_modified') or '',
         ))
-        print(f"Stored/Updated: {rec.get('title', doc_id)} ({level})")
 
-    conn.commit()
-    conn.close()
+    # One transaction for the whole batch, taking the write lock up front so
+    # a concurrent writer waits rather than failing on a lock upgrade.
+    try:
+        with _write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.executemany(UPSERT_REGULATION_SQL, rows)
+                stored = cursor.rowcount
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+    finally:
+        if owns_conn:
+            conn.close()
+    logger.info("Stored/Updated %d %s record(s), skipped %d with no update at source.",
+                stored, level, len(rows) - stored)
+
+
+def fetch_keyword_pages(fetch_page, max_pages=MAX_PAGES):
+    """Fetch up to ``max_pages`` result pages for every search keyword.
+
+    ``fetch_page(keyword, page)`` returns ``(records, total_pages)``. Page 1
+    of every keyword is fetched first to learn how many pages exist, then
+    all remaining pages are fetched together.
+    """
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        first = list(executor.map(lambda kw: fetch_page(kw, 1), SEARCH_KEYWORDS))
+        rest = [
+            (keyword, page)
+            for keyword, (_, total_pages) in zip(SEARCH_KEYWORDS, first)
+            for page in range(2, min(total_pages, max_pages) + 1)
+        ]
+        more = list(executor.map(lambda args: fetch_page(*args), rest))
+    return [rec for records, _ in first + more for rec in records]
+
+
+def cutoff_date(days_back):
+    """Return the YYYY-MM-DD date ``days_back`` days before today."""
+    return (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+
+
+def dump_json(obj):
+    """Serialize an API payload compactly for the full_text column.
+
+    Both encoders give compact, unescaped JSON that parses back to the same
+    strings, ints and nested structure, but the text is not byte-identical:
+    floats may be spelled differently (``1e+16`` vs ``1e16``), and orjson
+    writes NaN/Infinity as ``null`` where the stdlib writes ``NaN``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. integers wider than 64 bits
+            pass
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
 
 
 # -- Federal: Regulations.gov API (JSON:API format) --------------------------
 
+FEDERAL_URL = 'https://api.regulations.gov/v4/documents'
+
+
 def normalize_federal(data):
     """Normalize JSON:API items from Regulations.gov v4."""
-    records = []
-    for item in data:
-        attrs = item.get('attributes', {})
-        records.append({
+    _dumps = dump_json
+    return [
+        {
             'id': attrs.get('documentId') or item.get('id', ''),
             'title': attrs.get('title', ''),
             'description': attrs.get('summary', '') or attrs.get('abstract', ''),
             'published_date': attrs.get('postedDate', ''),
-            'full_text': json.dumps(attrs),
+            'full_text': _dumps(attrs),
             'source_last_modified': attrs.get('lastModifiedDate', '')
                                     or attrs.get('postedDate', ''),
-        })
-    return records
+        }
+        for item in data
+        for attrs in (item.get('attributes', {}),)
+    ]
 
 
-def fetch_federal_updates(days_back=7, page_size=10):
+def fetch_federal_updates(days_back=7, page_size=10, max_pages=MAX_PAGES, conn=None):
     if not FEDERAL_API_KEY:
-        print("Skipping federal: REGULATIONS_GOV_API_KEY not set.")
+        logger.info("Skipping federal: REGULATIONS_GOV_API_KEY not set.")
         return
-    base_url = 'https://api.regulations.gov/v4/documents'
-    from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
-    for keyword in SEARCH_KEYWORDS:
-        params = {
-            'filter[searchTerm]': keyword,
-            'filter[postedDate][ge]': from_date,
-            'sort': '-postedDate',
-            'page[size]': page_size,
-            'api_key': FEDERAL_API_KEY,
-        }
+    # Everything but the keyword and page number is fixed for this run
+    base_params = {
+        'filter[postedDate][ge]': cutoff_date(days_back),
+        'sort': '-postedDate',
+        'page[size]': page_size,
+        'api_key': FEDERAL_API_KEY,
+    }
+
+    def fetch_page(keyword, page):
+        params = {**base_params, 'filter[searchTerm]': keyword, 'page[number]': page}
         try:
-            response = requests.get(base_url, params=params, timeout=30)
+            response = SESSION.get(FEDERAL_URL, params=params, timeout=30)
             response.raise_for_status()
-            data = response.json().get('data', [])
-            records = normalize_federal(data)
-            store_records('federal', records, base_url)
+            payload = response.json()
+            total_pages = payload.get('meta', {}).get('totalPages', 1)
+            return normalize_federal(payload.get('data', [])), total_pages
         except requests.RequestException as e:
-            print(f"Federal fetch failed for '{keyword}': {e}")
+            logger.warning("Federal fetch failed for '%s' page %s: %s", keyword, page, e)
+            return [], 0
+
+    store_records('federal', fetch_keyword_pages(fetch_page, max_pages), FEDERAL_URL, conn=conn)
 
 
 # -- State: NYS Open Legislation API ----------------------------------------
 
+STATE_URL = 'https://legislation.nysenate.gov/api/3/bills'
+
+
 def normalize_state(items):
     """Normalize bill search results from the NYS Open Legislation API."""
     records = []
+    append = records.append
+    _dumps = dump_json
     for item in items:
         bill = item.get('result', {})
         print_no = bill.get('basePrintNo', '')
         session = bill.get('session', '')
-        title = bill.get('title', '')
-        summary = bill.get('summary', '')
         status = bill.get('status', {})
-        status_desc = status.get('statusDesc', '') if isinstance(status, dict) else ''
         action_date = status.get('actionDate', '') if isinstance(status, dict) else ''
-        doc_id = f"nys-{session}-{print_no}"
-        records.append({
-            'id': doc_id,
-            'title': f"{print_no}: {title}".strip(),
-            'description': summary,
+        append({
+            'id': f"nys-{session}-{print_no}",
+            'title': f"{print_no}: {bill.get('title', '')}".strip(),
+            'description': bill.get('summary', ''),
             'published_date': action_date or '',
-            'full_text': json.dumps(bill),
+            'full_text': _dumps(bill),
             'source_last_modified': action_date or '',
         })
     return records
 
 
-def fetch_state_updates(days_back=7, page_size=10):
+def fetch_state_updates(days_back=7, page_size=10, max_pages=MAX_PAGES, conn=None):
     if not STATE_API_KEY:
-        print("Skipping state: NYS_LEGISLATURE_API_KEY not set.")
+        logger.info("Skipping state: NYS_LEGISLATURE_API_KEY not set.")
         return
-    base_url = 'https://legislation.nysenate.gov/api/3/bills'
-    session_year = datetime.now().year
-    for keyword in SEARCH_KEYWORDS:
-        url = (
-            f'{base_url}/{session_year}/search'
-            f'?term={keyword}&limit={page_size}&key={STATE_API_KEY}'
-        )
+    search_url = f'{STATE_URL}/{datetime.now().year}/search'
+
+    def fetch_page(keyword, page):
+        # The API pages by 1-based offset rather than page number
+        offset = (page - 1) * page_size + 1
+        url = f'{search_url}?term={keyword}&limit={page_size}&offset={offset}&key={STATE_API_KEY}'
         try:
-            response = requests.get(url, timeout=30)
+            response = SESSION.get(url, timeout=30)
             response.raise_for_status()
-            data = response.json().get('result', {}).get('items', [])
-            records = normalize_state(data)
-            store_records('state', records, base_url)
+            payload = response.json()
+            total_pages = -(-payload.get('total', 0) // page_size) if page_size > 0 else 1
+            return normalize_state(payload.get('result', {}).get('items', [])), total_pages
         except requests.RequestException as e:
-            print(f"State fetch failed for '{keyword}': {e}")
+            logger.warning("State fetch failed for '%s' page %s: %s", keyword, page, e)
+            return [], 0
+
+    store_records('state', fetch_keyword_pages(fetch_page, max_pages), STATE_URL, conn=conn)
 
 
 # -- AI Briefs ---------------------------------------------------------------
 
+BRIEF_PROMPT = (
+    "You are a regulatory compliance analyst for the food & beverage industry.\n"
+    "Analyze this regulation and respond in JSON with exactly three fields:\n"
+    "- business_impact: 1-2 sentences on what this means for a food & bev business owner\n"
+    "- action_required: Specific steps the business owner needs to take\n"
+    "- penalty: What happens if they don't comply (fines, license revocation, etc.), "
+    "or \"Not specified\" if unclear\n\n"
+    "Title: {title}\n"
+    "Description: {description}\n"
+    "Full text: {full_text}\n"
+)
+
+BRIEF_WORKERS = 4
+BRIEF_TEXT_LIMIT = 3000  # characters of full_text sent to Claude
+BRIEF_BATCH_SIZE = 10
+
+# Captures the body of a markdown code fence, tolerating a missing closer
+_FENCE_RE = re.compile(r'^\s*```[^\n]*\n(.*?)\s*(?:```\s*)?$', re.DOTALL)
+
+
 def generate_brief(record):
-    """Call Claude to extract business impact, action required, and penalty."""
+    """Call Claude to extract business impact, action required, and penalty.
+
+    ``record`` is a mapping (a dict or ``sqlite3.Row``) with at least the keys
+    title, description and full_text.
+    """
     if not ANTHROPIC_API_KEY:
-        print("Skipping brief generation: ANTHROPIC_API_KEY not set.")
+        logger.info("Skipping brief generation: ANTHROPIC_API_KEY not set.")
         return None
 
     import anthropic
 
-    full_text = (record.get('full_text') or '')[:3000]
-    prompt = (
-        "You are a regulatory compliance analyst for the food & beverage industry.\n"
-        "Analyze this regulation and respond in JSON with exactly three fields:\n"
-        "- business_impact: 1-2 sentences on what this means for a food & bev business owner\n"
-        "- action_required: Specific steps the business owner needs to take\n"
-        "- penalty: What happens if they don't comply (fines, license revocation, etc.), "
-        "or \"Not specified\" if unclear\n\n"
-        f"Title: {record.get('title', '')}\n"
-        f"Description: {record.get('description', '')}\n"
-        f"Full text: {full_text}\n"
+    prompt = BRIEF_PROMPT.format(
+        title=record['title'] or '',
+        description=record['description'] or '',
+        full_text=(record['full_text'] or '')[:BRIEF_TEXT_LIMIT],
     )
 
     client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
@@ -218,60 +436,73 @@ def generate_brief(record):
 
     text = message.content[0].text
     # Strip markdown code fences if present
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-
-    return json.loads(text)
+    match = _FENCE_RE.match(text)
+    return json.loads(match.group(1) if match else text)
 
 
 def generate_all_briefs(days_back=14):
     """Find recent regulations without a brief and generate one for each."""
-    conn = sqlite3.connect(DB_FILE)
+    init_db()
+    conn = connect_db()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
-    cutoff = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+    cutoff = cutoff_date(days_back)
+    # Only what the prompt needs, with full_text truncated inside SQLite
     cursor.execute('''
-        SELECT r.* FROM regulations r
+        SELECT r.id, r.title, r.description,
+               substr(r.full_text, 1, ?) AS full_text
+        FROM regulations r
         LEFT JOIN briefs b ON r.id = b.regulation_id
         WHERE b.regulation_id IS NULL
           AND r.published_date >= ?
-    ''', (cutoff,))
+    ''', (BRIEF_TEXT_LIMIT, cutoff))
     rows = cursor.fetchall()
 
-    count = 0
-    for row in rows:
-        record = dict(row)
-        try:
-            result = generate_brief(record)
-        except Exception as e:
-            print(f"Brief generation failed for {record['id']}: {e}")
-            continue
-
-        if result is None:
-            break
-
-        now = datetime.now().isoformat()
-        cursor.execute('''
+    def flush(pending):
+        cursor.executemany('''
             INSERT OR REPLACE INTO briefs
                 (regulation_id, business_impact, action_required, penalty, generated_at)
             VALUES (?, ?, ?, ?, ?)
-        ''', (
-            record['id'],
-            result.get('business_impact', ''),
-            result.get('action_required', ''),
-            result.get('penalty', ''),
-            now,
-        ))
+        ''', pending)
         conn.commit()
-        count += 1
-        print(f"Brief generated for: {record.get('title', record['id'])}")
+        pending.clear()
 
+    # Claude calls are network-bound, so keep a few in flight at once and
+    # write the results from this thread in small batches.
+    count = 0
+    pending = []
+    with ThreadPoolExecutor(max_workers=BRIEF_WORKERS) as executor:
+        futures = {executor.submit(generate_brief, row): row for row in rows}
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning("Brief generation failed for %s: %s", record['id'], e)
+                continue
+
+            if result is None:
+                for other in futures:
+                    other.cancel()
+                break
+
+            pending.append((
+                record['id'],
+                result.get('business_impact', ''),
+                result.get('action_required', ''),
+                result.get('penalty', ''),
+                datetime.now().isoformat(),
+            ))
+            count += 1
+            logger.debug("Brief generated for: %s", record['title'] or record['id'])
+            if len(pending) >= BRIEF_BATCH_SIZE:
+                flush(pending)
+
+    if pending:
+        flush(pending)
     conn.close()
-    print(f"Generated {count} brief(s).")
+    logger.info("Generated %d brief(s).", count)
     return count
 
 
@@ -285,13 +516,26 @@ FETCH_FUNCTIONS = {
 }
 
 
-def aggregate_updates(sources=None, days_back=7, page_size=10):
+def aggregate_updates(sources=None, days_back=7, page_size=10, max_pages=MAX_PAGES):
     sources = sources or VALID_SOURCES
     init_db()
-    for source in sources:
-        print(f"Fetching {source} updates...")
-        FETCH_FUNCTIONS[source](days_back=days_back, page_size=page_size)
-    print(f"Aggregation complete. Data stored in {DB_FILE}")
+    # One connection for the whole run, shared by the fetcher threads;
+    # store_records() serializes their batches on _write_lock.
+    conn = connect_db(isolation_level=None, check_same_thread=False)
+
+    def fetch_source(source):
+        logger.info("Fetching %s updates...", source)
+        FETCH_FUNCTIONS[source](days_back=days_back, page_size=page_size,
+                                max_pages=max_pages, conn=conn)
+
+    # The sources are independent network round-trips, so overlap them.
+    try:
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            for future in [executor.submit(fetch_source, s) for s in sources]:
+                future.result()
+    finally:
+        conn.close()
+    logger.info("Aggregation complete. Data stored in %s", DB_FILE)
 
 
 def parse_args(argv=None):
@@ -304,7 +548,11 @@ def parse_args(argv=None):
     )
     parser.add_argument(
         '--page-size', type=int, default=10,
-        help="Max results per source (default: 10)"
+        help="Results per API page (default: 10)"
+    )
+    parser.add_argument(
+        '--max-pages', type=int, default=MAX_PAGES,
+        help=f"Max result pages per keyword (default: {MAX_PAGES})"
     )
     parser.add_argument(
         '--sources', nargs='+', choices=VALID_SOURCES, default=None,
@@ -318,6 +566,7 @@ def parse_args(argv=None):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     args = parse_args()
 
     if args.db_file:
@@ -333,4 +582,5 @@ if __name__ == "__main__":
         sources=args.sources,
         days_back=args.days_back,
         page_size=args.page_size,
+        max_pages=args.max_pages,
     )
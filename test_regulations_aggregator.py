@@ -1,10 +1,16 @@
+import html
 import json
+import re
 import sqlite3
 import os
+import sys
+import time
+from datetime import datetime, timezone
 import pytest
 from unittest.mock import patch, MagicMock
 
 import regulations_aggregator as ra
+import app as web
 
 
 @pytest.fixture(autouse=True)
@@ -35,6 +41,44 @@ def test_init_db_is_idempotent(use_temp_db):
     conn.close()
 
 
+def test_init_db_indexes_level_listing(use_temp_db):
+    conn = sqlite3.connect(use_temp_db)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM regulations WHERE level = ? "
+        "ORDER BY published_date DESC, id DESC LIMIT 25",
+        ("federal",),
+    ).fetchall()
+    conn.close()
+    details = " ".join(row[-1] for row in plan)
+    assert "idx_reg_level_pub" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_init_db_analyzes_only_without_statistics(use_temp_db, monkeypatch):
+    statements = []
+    connect = ra.connect_db
+
+    def traced_connect(**kwargs):
+        conn = connect(**kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(ra, "connect_db", traced_connect)
+    monkeypatch.setattr(ra, "_initialized_dbs", set())  # as in a new process
+    ra.init_db()
+    assert "ANALYZE" not in statements
+    assert "PRAGMA optimize=0x10002" in statements
+
+
+def test_init_db_recreates_schema_after_file_is_replaced(use_temp_db):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(use_temp_db + suffix):
+            os.remove(use_temp_db + suffix)
+    ra.init_db()
+    ra.store_records("federal", [_make_record()], "https://example.com")
+    assert _count_rows(use_temp_db) == 1
+
+
 # -- store_records -----------------------------------------------------------
 
 def _make_record(id="doc-1", title="Test", source_last_modified="2026-01-01"):
@@ -71,6 +115,14 @@ def test_store_records_inserts(use_temp_db):
     assert row["level"] == "federal"
 
 
+def test_store_records_stamps_last_updated(use_temp_db):
+    ra.store_records("federal", [_make_record()], "https://example.com")
+    stamped = datetime.fromisoformat(_get_row(use_temp_db, "doc-1")["last_updated"])
+    # UTC, so the ETag's MAX(last_updated) never steps back at a DST change
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert abs((now - stamped).total_seconds()) < 60
+
+
 def test_store_records_skips_missing_id(use_temp_db):
     ra.store_records("federal", [{"title": "no id"}], "https://example.com")
     assert _count_rows(use_temp_db) == 0
@@ -92,12 +144,76 @@ def test_store_records_updates_when_source_changed(use_temp_db):
     assert row["source_last_modified"] == "2026-01-02"
 
 
+def test_store_records_updates_when_source_date_missing(use_temp_db):
+    ra.store_records("federal", [_make_record(title="Undated", source_last_modified="")], "https://example.com")
+    ra.store_records("federal", [_make_record(title="Dated", source_last_modified="2026-01-01")], "https://example.com")
+    assert _get_row(use_temp_db, "doc-1")["title"] == "Dated"
+    ra.store_records("federal", [_make_record(title="Undated again", source_last_modified="")], "https://example.com")
+    assert _get_row(use_temp_db, "doc-1")["title"] == "Undated again"
+
+
 def test_store_records_multiple(use_temp_db):
     records = [_make_record(id="a"), _make_record(id="b"), _make_record(id="c")]
     ra.store_records("local", records, "https://example.com")
     assert _count_rows(use_temp_db) == 3
 
 
+def test_store_records_batch_applies_freshness_per_record(use_temp_db):
+    ra.store_records("federal", [_make_record(id="a", title="A1", source_last_modified="2026-01-02"),
+                                 _make_record(id="b", title="B1", source_last_modified="2026-01-02")],
+                     "https://example.com")
+    ra.store_records("federal", [
+        _make_record(id="a", title="A-stale", source_last_modified="2026-01-01"),
+        _make_record(id="b", title="B2", source_last_modified="2026-01-03"),
+        _make_record(id="c", title="C1", source_last_modified="2026-01-01"),
+        _make_record(id="c", title="C-dup-stale", source_last_modified="2026-01-01"),
+    ], "https://example.com")
+    assert _get_row(use_temp_db, "a")["title"] == "A1"
+    assert _get_row(use_temp_db, "b")["title"] == "B2"
+    assert _get_row(use_temp_db, "c")["title"] == "C1"
+
+
+def test_store_records_sees_changes_made_elsewhere(use_temp_db):
+    ra.store_records("federal", [_make_record(id="gone", source_last_modified="2026-01-03"),
+                                 _make_record(id="reset", source_last_modified="2026-01-03")],
+                     "https://example.com")
+    # Another process deletes one row and clears the other's source date
+    conn = sqlite3.connect(use_temp_db)
+    conn.execute("DELETE FROM regulations WHERE id = 'gone'")
+    conn.execute("UPDATE regulations SET source_last_modified = '' WHERE id = 'reset'")
+    conn.commit()
+    conn.close()
+    ra.store_records("federal", [_make_record(id="gone", source_last_modified="2026-01-03"),
+                                 _make_record(id="reset", title="Re-dated",
+                                              source_last_modified="2026-01-02")],
+                     "https://example.com")
+    assert _get_row(use_temp_db, "gone") is not None
+    assert _get_row(use_temp_db, "reset")["title"] == "Re-dated"
+
+
+def _search(db_path, query):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT r.id FROM regulations r JOIN regulations_fts f ON f.rowid = r.rowid "
+        "WHERE regulations_fts MATCH ?", (query,)
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+def test_store_records_keeps_search_index_in_sync(use_temp_db):
+    ra.store_records("federal", [_make_record(title="Dairy labeling")], "https://example.com")
+    assert _search(use_temp_db, "dairy") == ["doc-1"]
+    ra.store_records("federal", [_make_record(title="Seafood labeling", source_last_modified="2026-01-02")],
+                     "https://example.com")
+    assert _search(use_temp_db, "dairy") == []
+    assert _search(use_temp_db, "seafood") == ["doc-1"]
+    conn = sqlite3.connect(use_temp_db)
+    # Raises if the index has drifted from the content table
+    conn.execute("INSERT INTO regulations_fts(regulations_fts, rank) VALUES ('integrity-check', 1)")
+    conn.close()
+
+
 # -- normalize_federal -------------------------------------------------------
 
 def test_normalize_federal_extracts_attributes():
@@ -132,6 +248,13 @@ def test_normalize_federal_uses_abstract_if_no_summary():
     assert records[0]["description"] == "An abstract"
 
 
+def test_normalize_federal_full_text_is_compact_json():
+    attrs = {"title": "Café rule", "summary": "A summary"}
+    records = ra.normalize_federal([{"id": "1", "attributes": attrs}])
+    assert json.loads(records[0]["full_text"]) == attrs
+    assert records[0]["full_text"] == '{"title":"Café rule","summary":"A summary"}'
+
+
 def test_normalize_federal_empty_input():
     assert ra.normalize_federal([]) == []
 
@@ -179,7 +302,7 @@ def _mock_response(json_data, status_code=200):
     return mock
 
 
-@patch("regulations_aggregator.requests.get")
+@patch("regulations_aggregator.SESSION.get")
 def test_fetch_federal_stores_records(mock_get, use_temp_db, monkeypatch):
     monkeypatch.setattr(ra, "FEDERAL_API_KEY", "test-key")
     mock_get.return_value = _mock_response({
@@ -198,14 +321,14 @@ def test_fetch_federal_stores_records(mock_get, use_temp_db, monkeypatch):
     assert _get_row(use_temp_db, "FED-001-0001")["title"] == "Test Federal Doc"
 
 
-@patch("regulations_aggregator.requests.get")
+@patch("regulations_aggregator.SESSION.get")
 def test_fetch_federal_skips_without_key(mock_get, use_temp_db, monkeypatch):
     monkeypatch.setattr(ra, "FEDERAL_API_KEY", "")
     ra.fetch_federal_updates()
     mock_get.assert_not_called()
 
 
-@patch("regulations_aggregator.requests.get")
+@patch("regulations_aggregator.SESSION.get")
 def test_fetch_federal_handles_error(mock_get, use_temp_db, monkeypatch):
     monkeypatch.setattr(ra, "FEDERAL_API_KEY", "test-key")
     mock_get.side_effect = ra.requests.RequestException("timeout")
@@ -213,7 +336,35 @@ def test_fetch_federal_handles_error(mock_get, use_temp_db, monkeypatch):
     assert _count_rows(use_temp_db) == 0
 
 
-@patch("regulations_aggregator.requests.get")
+@patch("regulations_aggregator.SESSION.get")
+def test_fetch_federal_queries_every_keyword(mock_get, use_temp_db, monkeypatch):
+    monkeypatch.setattr(ra, "FEDERAL_API_KEY", "test-key")
+    mock_get.return_value = _mock_response({"data": []})
+    ra.fetch_federal_updates()
+    terms = sorted(c.kwargs["params"]["filter[searchTerm]"] for c in mock_get.call_args_list)
+    assert terms == sorted(ra.SEARCH_KEYWORDS)
+
+
+@patch("regulations_aggregator.SESSION.get")
+def test_fetch_federal_fetches_remaining_pages(mock_get, use_temp_db, monkeypatch):
+    monkeypatch.setattr(ra, "FEDERAL_API_KEY", "test-key")
+    monkeypatch.setattr(ra, "SEARCH_KEYWORDS", ["food"])
+
+    def page_response(url, params, timeout):
+        page = params["page[number]"]
+        return _mock_response({
+            "meta": {"totalPages": 4},
+            "data": [{"id": f"FED-{page}", "attributes": {"title": f"Page {page}"}}],
+        })
+
+    mock_get.side_effect = page_response
+    ra.fetch_federal_updates(max_pages=3)
+    pages = sorted(c.kwargs["params"]["page[number]"] for c in mock_get.call_args_list)
+    assert pages == [1, 2, 3]
+    assert _count_rows(use_temp_db) == 3
+
+
+@patch("regulations_aggregator.SESSION.get")
 def test_fetch_state_stores_records(mock_get, use_temp_db, monkeypatch):
     monkeypatch.setattr(ra, "STATE_API_KEY", "test-key")
     mock_get.return_value = _mock_response({
@@ -236,10 +387,240 @@ def test_fetch_state_stores_records(mock_get, use_temp_db, monkeypatch):
     assert _count_rows(use_temp_db) >= 1
 
 
-@patch("regulations_aggregator.requests.get")
+@patch("regulations_aggregator.SESSION.get")
 def test_fetch_state_skips_without_key(mock_get, use_temp_db, monkeypatch):
     monkeypatch.setattr(ra, "STATE_API_KEY", "")
     ra.fetch_state_updates()
     mock_get.assert_not_called()
 
 
+# -- AI briefs (mocked Claude) -----------------------------------------------
+
+def _fake_anthropic(reply_text):
+    module = MagicMock()
+    message = MagicMock()
+    message.content = [MagicMock(text=reply_text)]
+    module.Anthropic.return_value.messages.create.return_value = message
+    return module
+
+
+@pytest.mark.parametrize("reply", [
+    '{"business_impact": "x", "action_required": "y", "penalty": "z"}',
+    '```json\n{"business_impact": "x", "action_required": "y", "penalty": "z"}\n```',
+    '```\n{"business_impact": "x", "action_required": "y", "penalty": "z"}```',
+])
+def test_generate_brief_parses_reply(reply, monkeypatch):
+    monkeypatch.setattr(ra, "ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setitem(sys.modules, "anthropic", _fake_anthropic(reply))
+    result = ra.generate_brief({"id": "doc-1", "title": "T", "description": "D", "full_text": "F"})
+    assert result == {"business_impact": "x", "action_required": "y", "penalty": "z"}
+
+
+def test_generate_all_briefs_stores_each_result(use_temp_db, monkeypatch):
+    today = ra.datetime.now().strftime("%Y-%m-%d")
+    records = [dict(_make_record(id=i), published_date=today) for i in ("a", "b", "c")]
+    ra.store_records("federal", records, "https://example.com")
+
+    def fake_brief(record):
+        if record["id"] == "b":
+            raise ValueError("bad reply")
+        return {"business_impact": f"impact {record['id']}", "action_required": "act", "penalty": "none"}
+
+    monkeypatch.setattr(ra, "generate_brief", fake_brief)
+    assert ra.generate_all_briefs() == 2
+    conn = sqlite3.connect(use_temp_db)
+    rows = conn.execute("SELECT regulation_id, business_impact FROM briefs ORDER BY regulation_id").fetchall()
+    conn.close()
+    assert rows == [("a", "impact a"), ("c", "impact c")]
+
+
+# -- aggregate_updates -------------------------------------------------------
+
+def test_aggregate_updates_runs_each_source(monkeypatch):
+    calls = []
+
+    def fake_fetch(source, conn, **kwargs):
+        ra.store_records(source, [_make_record(id=f"{source}-1")], "https://example.com", conn=conn)
+        calls.append((source, kwargs))
+
+    for source in ra.VALID_SOURCES:
+        monkeypatch.setitem(ra.FETCH_FUNCTIONS, source,
+                            lambda source=source, **kwargs: fake_fetch(source, **kwargs))
+    ra.aggregate_updates(days_back=3, page_size=5, max_pages=2)
+    assert sorted(calls) == [(s, {"days_back": 3, "page_size": 5, "max_pages": 2})
+                             for s in sorted(ra.VALID_SOURCES)]
+    assert _count_rows(ra.DB_FILE) == len(ra.VALID_SOURCES)
+
+
+# -- app routes --------------------------------------------------------------
+
+@pytest.fixture
+def client(monkeypatch):
+    """Flask test client; drops the thread's cached connection to an older DB."""
+    monkeypatch.setattr(web, "_local", web.threading.local())
+    return web.app.test_client()
+
+
+def test_brief_generate_on_fresh_db(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(ra, "DB_FILE", str(tmp_path / "fresh.db"))
+    monkeypatch.setattr(ra, "ANTHROPIC_API_KEY", "")
+    response = client.post("/brief/generate")
+    assert response.status_code == 302
+    assert "/brief" in response.headers["Location"]
+
+
+def _seed_listing(count):
+    """Store ``count`` records split across levels, with shared dates to tie-break on id."""
+    for level in ("federal", "state"):
+        records = []
+        for i in range(count):
+            rec = _make_record(id=f"{level}-{i:03d}", title=f"{level} {i}")
+            rec["published_date"] = f"2026-01-{i % 7 + 1:02d}"
+            records.append(rec)
+        ra.store_records(level, records, "https://example.com")
+
+
+def _walk_pages(client, url):
+    """Follow Next links from ``url``; return the listed ids and the page bodies."""
+    ids, bodies = [], []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        bodies.append(body)
+        ids += re.findall(r"href='/record/([^']+)'", body)
+        match = re.search(r"href='([^']+)'>Next &raquo;", body)
+        url = html.unescape(match.group(1)) if match else None
+    return ids, bodies
+
+
+def test_index_pages_visit_every_row_once(client):
+    _seed_listing(30)
+    ids, bodies = _walk_pages(client, "/")
+    assert len(ids) == 60
+    assert len(set(ids)) == 60
+    assert len(bodies) == 3
+    assert "Page 1" in bodies[0] and "&laquo; First" not in bodies[0]
+    for number, body in enumerate(bodies[1:], start=2):
+        assert f"Page {number}" in body
+        assert "&laquo; First" in body
+
+
+def test_index_pages_follow_level_filter(client):
+    _seed_listing(30)
+    ids, bodies = _walk_pages(client, "/?level=state")
+    assert sorted(ids) == [f"state-{i:03d}" for i in range(30)]
+    assert len(bodies) == 2
+
+
+def test_index_pages_reach_legacy_undated_rows(client, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "legacy.db")
+    monkeypatch.setattr(ra, "DB_FILE", db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE regulations (id TEXT PRIMARY KEY, level TEXT, title TEXT, "
+                 "description TEXT, published_date TEXT, full_text TEXT, source_url TEXT, "
+                 "source_last_modified TEXT, last_updated TEXT)")
+    conn.execute("INSERT INTO regulations (id, level, published_date) "
+                 "VALUES ('dated', 'federal', '2026-01-01')")
+    conn.executemany("INSERT INTO regulations (id, level) VALUES (?, 'federal')",
+                     [(f"undated-{i:02d}",) for i in range(30)])
+    conn.commit()
+    conn.close()
+    ids, _ = _walk_pages(client, "/")
+    assert sorted(ids) == ["dated"] + [f"undated-{i:02d}" for i in range(30)]
+
+
+@pytest.mark.parametrize("before", ["!!!", "bm8tc2VwYXJhdG9y", "%ff"])
+def test_index_malformed_cursor_falls_back_to_first_page(client, before):
+    _seed_listing(30)
+    response = client.get(f"/?before={before}&page=3")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert "Page 1" in body
+    assert "&laquo; First" not in body
+    assert re.findall(r"href='/record/([^']+)'", body) == _walk_pages(client, "/")[0][:web.PAGE_SIZE]
+
+
+def test_index_revalidates_until_a_write(client):
+    ra.store_records("federal", [_make_record()], "https://example.com")
+    first = client.get("/")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag
+
+    cached = client.get("/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
+
+    # A compressing proxy may hand the client a weakened tag
+    weak = client.get("/", headers={"If-None-Match": "W/" + etag})
+    assert weak.status_code == 304
+
+    time.sleep(0.01)  # last_updated has millisecond resolution
+    # Same row count, so only MAX(last_updated) can move the ETag
+    ra.store_records("federal", [_make_record(title="Revised", source_last_modified="2026-01-02")],
+                     "https://example.com")
+    fresh = client.get("/", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert "Revised" in fresh.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("q", ['"', "NEAR(", "*", "a AND", "x:y", "-dairy", "(food OR", "^title",
+                               "\x00", "dai\x00ry", "\x1b[0m"])
+def test_index_search_tolerates_query_syntax(client, q):
+    ra.store_records("federal", [_make_record(title="Dairy labeling")], "https://example.com")
+    response = client.get("/", query_string={"q": q})
+    assert response.status_code == 200
+
+
+def test_index_search_matches_prefix(client):
+    ra.store_records("federal", [_make_record(id="dairy", title="Dairy labeling"),
+                                 _make_record(id="meat", title="Meat inspection")],
+                     "https://example.com")
+    body = client.get("/", query_string={"q": "dai"}).get_data(as_text=True)
+    assert re.findall(r"href='/record/([^']+)'", body) == ["dairy"]
+
+
+def test_record_routes_with_slash_in_id(client):
+    rec = _make_record(id="FDA-2026/0001", title="Slash title")
+    rec["full_text"] = "<b>raw</b> text"
+    ra.store_records("federal", [rec], "https://example.com")
+
+    detail = client.get("/record/FDA-2026/0001")
+    assert detail.status_code == 200
+    assert detail.mimetype == "text/html"
+    assert "Slash title" in detail.get_data(as_text=True)
+
+    full_text = client.get("/full_text/FDA-2026/0001")
+    assert full_text.status_code == 200
+    assert full_text.headers["Content-Type"] == "text/plain; charset=utf-8"
+    assert full_text.get_data(as_text=True) == "<b>raw</b> text"
+
+
+def test_record_routes_not_found(client):
+    detail = client.get("/record/missing/doc")
+    assert detail.status_code == 404
+    assert "<p>Record not found.</p>" in detail.get_data(as_text=True)
+
+    full_text = client.get("/full_text/missing/doc")
+    assert full_text.status_code == 404
+    assert full_text.headers["Content-Type"] == "text/plain; charset=utf-8"
+    assert full_text.get_data(as_text=True) == "Record not found."
+
+
+def test_index_etag_changes_with_listing_version(client, monkeypatch):
+    ra.store_records("federal", [_make_record()], "https://example.com")
+    etag = client.get("/").headers["ETag"]
+    monkeypatch.setattr(web, "_LISTING_ETAG_SALT", "redeployed")
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_record_detail_reachable_for_id_ending_in_full_text(client):
+    ra.store_records("federal", [_make_record(id="notes/full_text", title="Odd id")],
+                     "https://example.com")
+    detail = client.get("/record/notes/full_text")
+    assert detail.status_code == 200
+    assert "Odd id" in detail.get_data(as_text=True)
+    assert client.get("/full_text/notes/full_text").get_data(as_text=True) == "text"